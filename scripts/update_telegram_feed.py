@@ -1,28 +1,68 @@
 #!/usr/bin/env python3
 import argparse
 import hashlib
-import json
 import os
 import re
 import sys
 import time
-from dataclasses import dataclass
+from concurrent.futures import ThreadPoolExecutor, as_completed, wait
+from dataclasses import dataclass, field
+from functools import lru_cache
 from datetime import datetime, timezone
-from typing import Any, Dict, List, Optional, Tuple
+from typing import Any, Dict, Iterator, List, Optional, Tuple
 
+import orjson
 import requests
-from bs4 import BeautifulSoup
+from requests.adapters import HTTPAdapter
+from selectolax.lexbor import LexborHTMLParser, LexborNode
 
 try:
     import argostranslate.package
+    import argostranslate.settings
     import argostranslate.translate
+    import ctranslate2
+    import stanza
 except Exception:
     argostranslate = None  # type: ignore
 
 
 CHANNEL_RE = re.compile(r"^[a-zA-Z0-9_]{5,}$")
+BG_IMAGE_RE = re.compile(r"background-image\s*:\s*url\(([^)]+)\)")
+PARAGRAPH_SPLIT_RE = re.compile(r"\n{2,}")
+
+# Opening tag of the <section> that holds the message list on t.me/s/<channel>.
+MESSAGE_HISTORY_START = '<section class="tgme_channel_history'
+SECTION_TAG_RE = re.compile(r"<(/?)section\b", re.IGNORECASE)
+# CSS selectors for the Telegram preview markup, kept in one place so every
+# message reuses the same query strings.
+MESSAGE_SELECTOR = ".tgme_widget_message"
+MESSAGE_DATE_SELECTOR = "a.tgme_widget_message_date"
+MESSAGE_TIME_SELECTOR = "time"
+MESSAGE_TEXT_SELECTOR = ".tgme_widget_message_text"
+MESSAGE_MEDIA_SELECTOR = "a.tgme_widget_message_photo_wrap, a.tgme_widget_message_video_player"
+MESSAGE_IMG_SELECTOR = "img"
+# Channel avatar containers (the avatar is repeated on every post).
+AVATAR_CLASSES = frozenset({"tgme_widget_message_user", "tgme_widget_message_user_photo"})
 OPENAI_DEFAULT_MODEL = os.environ.get("OPENAI_MODEL") or "gpt-5.2"
 OPENAI_PROMPT_VERSION = "pro_editorial_translator_v1"
+# Max OpenAI translation requests in flight at once.
+OPENAI_MAX_WORKERS = 8
+# Reasoning models (Responses API) spend part of max_output_tokens on hidden reasoning.
+OPENAI_REASONING_TOKEN_HEADROOM = 4096
+# Base per-request timeout. Generation calls aren't streamed, so they also get time for their
+# translation budget at OPENAI_MIN_TOKENS_PER_S, up to the old flat 180s for the longest posts.
+OPENAI_TIMEOUT_S = 60
+OPENAI_MAX_TIMEOUT_S = 180
+OPENAI_MIN_TOKENS_PER_S = 25
+# Rate limits and transient server errors are retried with the same backoff as timeouts.
+OPENAI_RETRY_STATUSES = frozenset({429, 500, 502, 503, 504})
+# --openai-batch only kicks in when at least this many posts need translating.
+OPENAI_BATCH_MIN_POSTS = 8
+OPENAI_BATCH_POLL_S = 30
+# Give up on a batch after this long and translate the remainder synchronously.
+OPENAI_BATCH_MAX_WAIT_S = 2 * 60 * 60
+# After cancelling, stop waiting for the batch to wind down after this long.
+OPENAI_BATCH_CANCEL_GRACE_S = 10 * 60
 
 OPENAI_SYSTEM_PROMPT = """You are a professional editorial translator.
 
@@ -60,9 +100,11 @@ If sentences are fragmented or abrupt — preserve it.
 Translate meaning-for-meaning, not word-for-word, but always favor STYLE over linguistic correctness.
 
 Output ONLY the translated text.'''
+# Split once so each prompt is a single concatenation around the post text.
+_PROMPT_PREFIX, _PROMPT_SUFFIX = OPENAI_USER_PROMPT_TEMPLATE.split("{POST_TEXT}", 1)
 
 
-@dataclass(frozen=True)
+@dataclass(frozen=True, slots=True)
 class TgPost:
     channel: str
     message_id: int
@@ -70,15 +112,38 @@ class TgPost:
     date_utc: Optional[str]
     text_ru: str
     images: List[str]
+    # Per-instance memo slots, filled via object.__setattr__ since the dataclass is frozen.
+    _text_ru_utf8: bytes = field(default=b"", init=False, repr=False, compare=False)
+    _text_hash: Optional[str] = field(default=None, init=False, repr=False, compare=False)
+    _content_hash: Optional[str] = field(default=None, init=False, repr=False, compare=False)
+
+    def __post_init__(self) -> None:
+        object.__setattr__(self, "_text_ru_utf8", self.text_ru.encode("utf-8"))
 
     @property
     def key(self) -> str:
         return f"{self.channel}/{self.message_id}"
 
+    @property
+    def text_hash(self) -> str:
+        # Only the text matters for translation, unlike content_hash.
+        h = self._text_hash
+        if h is None:
+            h = hashlib.sha256(self._text_ru_utf8).hexdigest()
+            object.__setattr__(self, "_text_hash", h)
+        return h
+
     @property
     def content_hash(self) -> str:
+        h = self._content_hash
+        if h is None:
+            h = self._compute_content_hash()
+            object.__setattr__(self, "_content_hash", h)
+        return h
+
+    def _compute_content_hash(self) -> str:
         h = hashlib.sha256()
-        h.update(self.text_ru.encode("utf-8"))
+        h.update(self._text_ru_utf8)
         h.update(b"\n")
         h.update((self.date_utc or "").encode("utf-8"))
         if self.images:
@@ -89,6 +154,9 @@ class TgPost:
         return h.hexdigest()
 
 
+DEFAULT_TRANSLATION_CACHE = os.path.join(os.path.dirname(os.path.abspath(__file__)), ".translate_cache.json")
+
+
 def utc_now_iso() -> str:
     return datetime.now(timezone.utc).replace(microsecond=0).isoformat().replace("+00:00", "Z")
 
@@ -112,18 +180,44 @@ def parse_args(argv: List[str]) -> argparse.Namespace:
         help="Translation backend. 'auto' uses OpenAI if OPENAI_API_KEY is set, else Argos. 'argos' is free/offline. 'none' disables translation.",
     )
     p.add_argument("--openai-model", default=OPENAI_DEFAULT_MODEL, help="OpenAI model (default: env OPENAI_MODEL or gpt-4o-mini).")
+    p.add_argument(
+        "--translation-cache",
+        default=DEFAULT_TRANSLATION_CACHE,
+        help="JSON file memoizing translations by post text + translator (default: scripts/.translate_cache.json). Empty string disables it.",
+    )
+    p.add_argument(
+        "--openai-batch",
+        action="store_true",
+        help=f"Use the OpenAI Batch API (about half the cost, but slower) when at least {OPENAI_BATCH_MIN_POSTS} posts need translating.",
+    )
     return p.parse_args(argv)
 
 
+def _make_session() -> requests.Session:
+    session = requests.Session()
+    session.mount("https://", HTTPAdapter(pool_connections=4, pool_maxsize=8))
+    return session
+
+
+# Shared session so paginated requests reuse the same keep-alive connection
+# instead of paying a TCP + TLS handshake per page.
+_SESSION = _make_session()
+
+
 def http_get(url: str, timeout_s: int, user_agent: str) -> str:
-    r = requests.get(url, timeout=timeout_s, headers={"User-Agent": user_agent})
+    r = _SESSION.get(url, timeout=timeout_s, headers={"User-Agent": user_agent})
     r.raise_for_status()
     return r.text
 
 
-def extract_message_id_and_url(channel: str, el) -> Optional[Tuple[int, str]]:
+@lru_cache(maxsize=8)
+def _post_url_re(channel: str) -> re.Pattern[str]:
+    return re.compile(rf"https?://t\.me/{re.escape(channel)}/(\d+)")
+
+
+def extract_message_id_and_url(channel: str, el: LexborNode) -> Optional[Tuple[int, str]]:
     # Telegram preview uses data-post="channel/123"
-    data_post = el.get("data-post") if hasattr(el, "get") else None
+    data_post = el.attributes.get("data-post")
     if data_post and isinstance(data_post, str) and data_post.startswith(channel + "/"):
         try:
             msg_id = int(data_post.split("/", 1)[1])
@@ -132,36 +226,36 @@ def extract_message_id_and_url(channel: str, el) -> Optional[Tuple[int, str]]:
             return None
 
     # Fallback: find date link with href ".../123"
-    a = el.select_one("a.tgme_widget_message_date")
-    if a and a.has_attr("href"):
-        href = a["href"]
-        m = re.search(rf"https?://t\.me/{re.escape(channel)}/(\d+)", href)
+    a = el.css_first(MESSAGE_DATE_SELECTOR)
+    href = a.attributes.get("href") if a is not None else None
+    if href:
+        m = _post_url_re(channel).search(href)
         if m:
             msg_id = int(m.group(1))
             return msg_id, href
     return None
 
 
-def extract_date_utc(el) -> Optional[str]:
-    time_el = el.select_one("time")
-    if time_el and time_el.has_attr("datetime"):
-        dt = str(time_el["datetime"]).strip()
+def extract_date_utc(el: LexborNode) -> Optional[str]:
+    time_el = el.css_first(MESSAGE_TIME_SELECTOR)
+    if time_el is not None:
+        dt = (time_el.attributes.get("datetime") or "").strip()
         return dt or None
     return None
 
 
-def extract_text_ru(el) -> str:
-    text_el = el.select_one(".tgme_widget_message_text")
-    if not text_el:
+def extract_text_ru(el: LexborNode) -> str:
+    text_el = el.css_first(MESSAGE_TEXT_SELECTOR)
+    if text_el is None:
         return ""
     # Preserve line breaks from <br> etc.
-    txt = text_el.get_text("\n")
+    txt = text_el.text(separator="\n")
     return (txt or "").strip()
 
 
 def _extract_bg_image_url(style: str) -> Optional[str]:
     # style like: background-image:url('https://...'); or url("...") or url(...)
-    m = re.search(r"background-image\s*:\s*url\(([^)]+)\)", style or "")
+    m = BG_IMAGE_RE.search(style or "")
     if not m:
         return None
     raw = m.group(1).strip().strip("'").strip('"').strip()
@@ -170,43 +264,65 @@ def _extract_bg_image_url(style: str) -> Optional[str]:
     return None
 
 
-def extract_image_urls(el) -> List[str]:
-    urls: List[str] = []
+def _has_class_ancestor(el: LexborNode, class_names: frozenset[str]) -> bool:
+    parent = el.parent
+    while parent is not None:
+        if not class_names.isdisjoint((parent.attributes.get("class") or "").split()):
+            return True
+        parent = parent.parent
+    return False
+
+
+def extract_image_urls(el: LexborNode) -> List[str]:
+    # Dict keys double as an insertion-ordered set: duplicates are dropped while collecting.
+    urls: Dict[str, None] = {}
 
     # Photos & video previews are often background-image on <a>
-    for a in el.select("a.tgme_widget_message_photo_wrap, a.tgme_widget_message_video_player"):
-        style = a.get("style") if hasattr(a, "get") else None
+    for a in el.css(MESSAGE_MEDIA_SELECTOR):
+        style = a.attributes.get("style")
         if isinstance(style, str):
             u = _extract_bg_image_url(style)
             if u:
-                urls.append(u)
+                urls[u] = None
 
     # Fallback: any <img src="..."> inside the message
-    for img in el.select("img"):
+    for img in el.css(MESSAGE_IMG_SELECTOR):
         # Avoid grabbing the channel avatar (repeated on every post)
-        if img.find_parent(class_="tgme_widget_message_user") is not None:
+        if _has_class_ancestor(img, AVATAR_CLASSES):
             continue
-        if img.find_parent(class_="tgme_widget_message_user_photo") is not None:
-            continue
-        src = img.get("src") if hasattr(img, "get") else None
+        src = img.attributes.get("src")
         if isinstance(src, str) and (src.startswith("http://") or src.startswith("https://")):
-            urls.append(src)
+            urls[src] = None
 
-    # Dedupe while preserving order
-    out: List[str] = []
-    seen: set[str] = set()
-    for u in urls:
-        if u in seen:
-            continue
-        seen.add(u)
-        out.append(u)
-    return out
+    return list(urls)
+
+
+def _message_history_html(html: str) -> str:
+    """
+    Narrows a preview page down to its message list so the channel header, footer and
+    scripts are never parsed. Returns the page unchanged if the markup isn't recognised.
+    """
+    start = html.find(MESSAGE_HISTORY_START)
+    if start == -1:
+        return html
+    # Balance <section> tags so a section nested inside the history can't cut it short.
+    depth = 0
+    for m in SECTION_TAG_RE.finditer(html, start):
+        depth += -1 if m.group(1) else 1
+        if depth == 0:
+            end = html.find(">", m.end())
+            return html[start:] if end == -1 else html[start : end + 1]
+    return html[start:]
 
 
 def parse_preview_html(channel: str, html: str) -> List[TgPost]:
-    soup = BeautifulSoup(html, "html.parser")
+    history = _message_history_html(html)
+    # No post markers at all (empty or error page): nothing worth building a tree for.
+    if "data-post=" not in history and "tgme_widget_message_date" not in history:
+        return []
+    tree = LexborHTMLParser(history)
     posts: List[TgPost] = []
-    for msg in soup.select(".tgme_widget_message"):
+    for msg in tree.css(MESSAGE_SELECTOR):
         id_and_url = extract_message_id_and_url(channel, msg)
         if not id_and_url:
             continue
@@ -230,6 +346,9 @@ def parse_preview_html(channel: str, html: str) -> List[TgPost]:
 
 
 def fetch_latest_posts(channel: str, limit: int, max_pages: int, timeout_s: int, user_agent: str) -> List[TgPost]:
+    # Pages are fetched one at a time on purpose: each ?before= cursor comes from the previous
+    # page, so there is nothing to overlap within a channel. Connection reuse comes from _SESSION.
+    # The feed is single-channel; to cover more channels, run the script once per channel/output.
     seen: set[str] = set()
     collected: List[TgPost] = []
     before: Optional[int] = None
@@ -241,21 +360,24 @@ def fetch_latest_posts(channel: str, limit: int, max_pages: int, timeout_s: int,
         if not page_posts:
             break
 
-        new_in_page = 0
+        # Single pass: dedupe into `collected` and track the page's oldest id for pagination.
+        page_had_new = False
+        oldest_id = page_posts[0].message_id
         for p in page_posts:
+            if p.message_id < oldest_id:
+                oldest_id = p.message_id
             if p.key in seen:
                 continue
             seen.add(p.key)
             collected.append(p)
-            new_in_page += 1
+            page_had_new = True
 
         # Pagination: request older posts next
-        oldest_id = min(p.message_id for p in page_posts)
         if before is not None and oldest_id >= before:
             break
         before = oldest_id
 
-        if new_in_page == 0:
+        if not page_had_new:
             break
         if len(collected) >= limit:
             break
@@ -267,17 +389,33 @@ def fetch_latest_posts(channel: str, limit: int, max_pages: int, timeout_s: int,
 
 def load_existing_feed(path: str) -> Dict[str, Any]:
     try:
-        with open(path, "r", encoding="utf-8") as f:
-            return json.load(f)
+        with open(path, "rb") as f:
+            return orjson.loads(f.read())
     except Exception:
         return {}
 
 
+def load_translation_cache(path: str) -> Dict[str, Dict[str, str]]:
+    cache = load_existing_feed(path)
+    return {k: v for k, v in cache.items() if isinstance(v, dict)} if isinstance(cache, dict) else {}
+
+
+# Set once the ru->en package is known to be installed; the check scans package metadata on disk.
+_ARGOS_READY = False
+# The installed ru->en translation object, resolved once (see _argos_ru_en).
+_ARGOS_RU_EN: Optional[Any] = None
+
+
 def ensure_argos_ru_en_installed() -> None:
+    global _ARGOS_READY
+    if _ARGOS_READY:
+        return
+
     installed = argostranslate.translate.get_installed_languages()
     has_ru = any(l.code == "ru" for l in installed)
     has_en = any(l.code == "en" for l in installed)
     if has_ru and has_en:
+        _ARGOS_READY = True
         return
 
     argostranslate.package.update_package_index()
@@ -287,6 +425,30 @@ def ensure_argos_ru_en_installed() -> None:
         raise RuntimeError("Could not find Argos translation package ru->en.")
     download_path = pkg.download()
     argostranslate.package.install_from_path(download_path)
+    _ARGOS_READY = True
+
+
+def _argos_ru_en() -> Any:
+    """
+    Returns the ru->en translation once per process; argostranslate.translate.translate()
+    re-resolves installed languages on every call.
+    """
+    global _ARGOS_RU_EN
+    if _ARGOS_RU_EN is None:
+        installed = argostranslate.translate.get_installed_languages()
+        from_lang = next((l for l in installed if l.code == "ru"), None)
+        to_lang = next((l for l in installed if l.code == "en"), None)
+        translation = from_lang.get_translation(to_lang) if from_lang and to_lang else None
+        if translation is None:
+            raise RuntimeError("Argos translation ru->en is not installed.")
+        _ARGOS_RU_EN = translation
+    return _ARGOS_RU_EN
+
+
+# Packing budget for translate_ru_to_en_argos.
+ARGOS_CHUNK_CHARS = 2000
+# CTranslate2 batches are sized by token count, so many short sentences share a batch.
+ARGOS_BATCH_TOKENS = 1024
 
 
 def translate_ru_to_en_argos(text_ru: str) -> str:
@@ -294,18 +456,197 @@ def translate_ru_to_en_argos(text_ru: str) -> str:
         return ""
 
     ensure_argos_ru_en_installed()
+    ru_en = _argos_ru_en()
+
+    # Chunk by paragraphs to avoid extremely long sequences, but pack short paragraphs together
+    # so translate() is called once per chunk rather than once per paragraph. (Argos still runs
+    # the model once per line internally; this only saves the Python-level call overhead.)
+    parts = [part.strip() for part in PARAGRAPH_SPLIT_RE.split(text_ru.strip()) if part.strip()]
+    chunks: List[List[str]] = []
+    chunk_chars = 0
+    for part in parts:
+        if chunks and chunk_chars + 2 + len(part) <= ARGOS_CHUNK_CHARS:
+            chunks[-1].append(part)
+            chunk_chars += len(part) + 2
+        else:
+            chunks.append([part])
+            chunk_chars = len(part)
 
-    # Chunk by paragraphs to avoid extremely long sequences
-    parts = re.split(r"\n{2,}", text_ru.strip())
     out_parts: List[str] = []
-    for part in parts:
-        part = part.strip()
-        if not part:
-            continue
-        out_parts.append(argostranslate.translate.translate(part, "ru", "en"))
+    for chunk in chunks:
+        # Argos translates line by line and keeps blank lines, so the paragraph breaks survive.
+        translated = ru_en.translate("\n\n".join(chunk))
+        chunk_out = PARAGRAPH_SPLIT_RE.split(translated.strip())
+        if len(chunk_out) != len(chunk):
+            # Paragraph structure didn't survive; translate this chunk one paragraph at a time.
+            chunk_out = [ru_en.translate(part) for part in chunk]
+        out_parts.extend(chunk_out)
     return "\n\n".join(out_parts).strip()
 
 
+# (package, CTranslate2 translator, stanza sentencizer), loaded on first use.
+_ARGOS_ENGINE: Optional[Tuple[Any, Any, Any]] = None
+
+
+def _argos_engine() -> Optional[Tuple[Any, Any, Any]]:
+    """
+    Opens the installed ru->en Argos model directly with CTranslate2.
+    Returns None when the package can't be driven this way (e.g. no stanza sentencizer).
+    """
+    global _ARGOS_ENGINE
+    if _ARGOS_ENGINE is not None:
+        return _ARGOS_ENGINE
+    if not argostranslate.settings.stanza_available:
+        return None
+    pkg = next(
+        (
+            p
+            for p in argostranslate.package.get_installed_packages()
+            if p.type == "translate" and p.from_code == "ru" and p.to_code == "en"
+        ),
+        None,
+    )
+    if pkg is None or not (pkg.package_path / "stanza").is_dir():
+        return None
+    translator = ctranslate2.Translator(
+        str(pkg.package_path / "model"),
+        device=argostranslate.settings.device,
+        inter_threads=2,
+        intra_threads=max(1, (os.cpu_count() or 2) // 2),
+    )
+    sentencizer = stanza.Pipeline(
+        lang=pkg.from_code,
+        dir=str(pkg.package_path / "stanza"),
+        processors="tokenize",
+        use_gpu=argostranslate.settings.device == "cuda",
+        logging_level="WARNING",
+    )
+    _ARGOS_ENGINE = (pkg, translator, sentencizer)
+    return _ARGOS_ENGINE
+
+
+def translate_ru_to_en_argos_batch(texts_ru: List[str]) -> List[str]:
+    """
+    Translates many posts with one batched CTranslate2 call instead of one Argos call per paragraph.
+    Mirrors Argos' own pipeline: paragraphs -> lines -> stanza sentences -> package tokenizer.
+    """
+    if not any(t.strip() for t in texts_ru):
+        return ["" for _ in texts_ru]
+
+    ensure_argos_ru_en_installed()
+    engine = _argos_engine()
+    if engine is None:
+        return [translate_ru_to_en_argos(t) for t in texts_ru]
+    pkg, translator, sentencizer = engine
+
+    # layout[post][paragraph][line] = (start, end) slice of `batch` holding that line's sentences
+    batch: List[List[str]] = []
+    layout: List[List[List[Tuple[int, int]]]] = []
+    for text_ru in texts_ru:
+        paragraphs: List[List[Tuple[int, int]]] = []
+        for part in PARAGRAPH_SPLIT_RE.split(text_ru.strip()):
+            part = part.strip()
+            if not part:
+                continue
+            lines: List[Tuple[int, int]] = []
+            for line in part.split("\n"):
+                start = len(batch)
+                if line.strip():
+                    for sentence in sentencizer(line).sentences:
+                        batch.append(pkg.tokenizer.encode(sentence.text))
+                lines.append((start, len(batch)))
+            paragraphs.append(lines)
+        layout.append(paragraphs)
+
+    target_prefix = [[pkg.target_prefix]] * len(batch) if pkg.target_prefix else None
+    results = translator.translate_batch(
+        batch,
+        target_prefix=target_prefix,
+        replace_unknowns=True,
+        max_batch_size=ARGOS_BATCH_TOKENS,
+        batch_type="tokens",
+        beam_size=4,
+        length_penalty=0.2,
+        asynchronous=True,
+    )
+    hypotheses = [r.result().hypotheses[0] for r in results]
+
+    def decode(start: int, end: int) -> str:
+        value = pkg.tokenizer.decode([tok for h in hypotheses[start:end] for tok in h])
+        if pkg.target_prefix and value.startswith(pkg.target_prefix):
+            value = value[len(pkg.target_prefix) :]
+        return value[1:] if value.startswith(" ") else value
+
+    out: List[str] = []
+    for paragraphs in layout:
+        out_parts = ["\n".join(decode(start, end) for start, end in lines).lstrip("\n") for lines in paragraphs]
+        out.append("\n\n".join(out_parts).strip())
+    return out
+
+
+class OpenAIOutputIncomplete(RuntimeError):
+    """The model stopped at its output-token bound, so the text is a partial translation."""
+
+
+def _openai_timeout_s(max_tokens: int, timeout_s: int) -> int:
+    # max_tokens is the translation budget only; reasoning headroom would push every call past the cap.
+    return max(timeout_s, min(OPENAI_MAX_TIMEOUT_S, OPENAI_TIMEOUT_S + max_tokens // OPENAI_MIN_TOKENS_PER_S))
+
+
+def _output_token_budget(user: str) -> int:
+    # A translation is roughly as long as its source; ~2 chars per token leaves plenty of slack.
+    return max(256, min(4096, len(user) // 2))
+
+
+def _chat_completion_payload(
+    *,
+    model: str,
+    messages: List[Dict[str, str]],
+    response_format: Optional[Dict[str, str]] = None,
+) -> Dict[str, Any]:
+    user = "".join(m["content"] for m in messages if m.get("role") == "user")
+    return {
+        "model": model,
+        "messages": messages,
+        "temperature": 0.1,
+        "max_tokens": _output_token_budget(user),
+        "response_format": response_format or {"type": "text"},
+    }
+
+
+def _responses_payload(*, model: str, system: str, user: str) -> Dict[str, Any]:
+    return {
+        "model": model,
+        # Recommended shape for newest models: user input + separate instructions.
+        "instructions": system,
+        "input": user,
+        "max_output_tokens": _output_token_budget(user) + OPENAI_REASONING_TOKEN_HEADROOM,
+    }
+
+
+def _iter_response_texts(data: Dict[str, Any]) -> Iterator[str]:
+    for item in data.get("output") or []:
+        if not isinstance(item, dict):
+            continue
+        for c in item.get("content") or []:
+            if not isinstance(c, dict):
+                continue
+            if c.get("type") in ("output_text", "text"):
+                t = c.get("text")
+                if isinstance(t, str) and t.strip():
+                    yield t
+
+
+def _responses_output_text(data: Dict[str, Any]) -> str:
+    # Some responses include a convenience field; then the output list is never walked.
+    out_text = data.get("output_text")
+    if isinstance(out_text, str) and out_text.strip():
+        return out_text.strip()
+
+    # Otherwise, stitch together all output_text parts.
+    return "\n".join(_iter_response_texts(data)).strip()
+
+
 def openai_chat_completion(
     *,
     api_key: str,
@@ -319,19 +660,16 @@ def openai_chat_completion(
         "Authorization": f"Bearer {api_key}",
         "Content-Type": "application/json",
     }
-    payload: Dict[str, Any] = {
-        "model": model,
-        "messages": messages,
-        "temperature": 0.1,
-    }
-    if response_format:
-        payload["response_format"] = response_format
-    openai_timeout = max(180, timeout_s)
+    payload = _chat_completion_payload(model=model, messages=messages, response_format=response_format)
+    openai_timeout = _openai_timeout_s(payload["max_tokens"], timeout_s)
     r = requests.post(url, headers=headers, json=payload, timeout=openai_timeout)
     if not r.ok:
         raise RuntimeError(f"OpenAI chat.completions error {r.status_code}: {r.text}")
     data = r.json()
-    return str(data["choices"][0]["message"]["content"])
+    choice = data["choices"][0]
+    if choice.get("finish_reason") == "length":
+        raise OpenAIOutputIncomplete("OpenAI chat.completions output was truncated by max_tokens.")
+    return str(choice["message"]["content"])
 
 
 def openai_responses_text(*, api_key: str, model: str, system: str, user: str, timeout_s: int) -> str:
@@ -340,24 +678,23 @@ def openai_responses_text(*, api_key: str, model: str, system: str, user: str, t
         "Authorization": f"Bearer {api_key}",
         "Content-Type": "application/json",
     }
-    payload: Dict[str, Any] = {
-        "model": model,
-        # Recommended shape for newest models: user input + separate instructions.
-        "instructions": system,
-        "input": user,
-    }
-    openai_timeout = max(180, timeout_s)
-    # Retry a couple of times on read timeouts / transient network issues.
+    payload = _responses_payload(model=model, system=system, user=user)
+    openai_timeout = _openai_timeout_s(_output_token_budget(user), timeout_s)
+    # Retry a couple of times on read timeouts / transient network issues / rate limits.
     last_err: Optional[Exception] = None
     for attempt in range(3):
         try:
             r = requests.post(url, headers=headers, json=payload, timeout=openai_timeout)
-            break
         except (requests.exceptions.ReadTimeout, requests.exceptions.ConnectionError) as e:
             last_err = e
             if attempt == 2:
                 raise
             time.sleep(2**attempt)
+            continue
+        if r.status_code in OPENAI_RETRY_STATUSES and attempt < 2:
+            time.sleep(2**attempt)
+            continue
+        break
     else:
         if last_err:
             raise last_err
@@ -366,25 +703,9 @@ def openai_responses_text(*, api_key: str, model: str, system: str, user: str, t
     if not r.ok:
         raise RuntimeError(f"OpenAI responses error {r.status_code}: {r.text}")
     data = r.json()
-
-    # Some responses include a convenience field.
-    out_text = data.get("output_text")
-    if isinstance(out_text, str) and out_text.strip():
-        return out_text.strip()
-
-    # Otherwise, stitch together all output_text parts.
-    parts: List[str] = []
-    for item in data.get("output", []) or []:
-        if not isinstance(item, dict):
-            continue
-        for c in item.get("content", []) or []:
-            if not isinstance(c, dict):
-                continue
-            if c.get("type") in ("output_text", "text"):
-                t = c.get("text")
-                if isinstance(t, str) and t.strip():
-                    parts.append(t)
-    return "\n".join(parts).strip()
+    if data.get("status") == "incomplete":
+        raise OpenAIOutputIncomplete(f"OpenAI response incomplete: {data.get('incomplete_details')}")
+    return _responses_output_text(data)
 
 
 def openai_text(*, api_key: str, model: str, system: str, user: str, timeout_s: int) -> str:
@@ -404,6 +725,12 @@ def openai_text(*, api_key: str, model: str, system: str, user: str, timeout_s:
     )
 
 
+def openai_user_prompt(text_ru: str) -> str:
+    # Everything before the post text is identical across requests, which keeps the prompt
+    # prefix stable for OpenAI's automatic prompt caching.
+    return f"{_PROMPT_PREFIX}{text_ru}{_PROMPT_SUFFIX}"
+
+
 def translate_and_format_ru_to_en_openai(*, text_ru: str, model: str, timeout_s: int) -> Tuple[str, str]:
     """Returns (title_en, text_en). title_en is intentionally left blank for this prompt."""
     if not text_ru.strip():
@@ -414,13 +741,198 @@ def translate_and_format_ru_to_en_openai(*, text_ru: str, model: str, timeout_s:
         raise RuntimeError("OPENAI_API_KEY is not set.")
 
     system = OPENAI_SYSTEM_PROMPT
-    user = OPENAI_USER_PROMPT_TEMPLATE.replace("{POST_TEXT}", text_ru)
-    content = openai_text(api_key=api_key, model=model, system=system, user=user, timeout_s=timeout_s)
+    user = openai_user_prompt(text_ru)
+    try:
+        content = openai_text(api_key=api_key, model=model, system=system, user=user, timeout_s=timeout_s)
+    except (OpenAIOutputIncomplete, requests.exceptions.ReadTimeout) as e:
+        # Leave this post untranslated (and uncached) rather than failing the whole feed update;
+        # an empty text_en is never reused, so the next run tries again.
+        print(f"Skipping translation of a post: {e}", file=sys.stderr)
+        return "", ""
 
     # Output is expected to be ONLY the translated text.
     return "", content.strip()
 
 
+def translate_ru_to_en_openai_batch(*, texts_ru: Dict[str, str], model: str, timeout_s: int) -> Dict[str, str]:
+    """
+    Translates posts through the OpenAI Batch API (roughly half the price of synchronous calls).
+    texts_ru maps custom_id -> Russian text. Returns custom_id -> English text for the requests
+    that completed; the caller is expected to translate anything missing synchronously.
+    """
+    api_key = os.environ.get("OPENAI_API_KEY", "").strip()
+    if not api_key:
+        raise RuntimeError("OPENAI_API_KEY is not set.")
+
+    base = "https://api.openai.com/v1"
+    headers = {"Authorization": f"Bearer {api_key}"}
+    http_timeout = max(OPENAI_TIMEOUT_S, timeout_s)
+    use_responses = model.startswith("gpt-5")
+    endpoint = "/v1/responses" if use_responses else "/v1/chat/completions"
+
+    lines: List[bytes] = []
+    for custom_id, text_ru in texts_ru.items():
+        user = openai_user_prompt(text_ru)
+        if use_responses:
+            body = _responses_payload(model=model, system=OPENAI_SYSTEM_PROMPT, user=user)
+        else:
+            body = _chat_completion_payload(
+                model=model,
+                messages=[
+                    {"role": "system", "content": OPENAI_SYSTEM_PROMPT},
+                    {"role": "user", "content": user},
+                ],
+            )
+        lines.append(orjson.dumps({"custom_id": custom_id, "method": "POST", "url": endpoint, "body": body}))
+
+    r = requests.post(
+        f"{base}/files",
+        headers=headers,
+        data={"purpose": "batch"},
+        files={"file": ("translations.jsonl", b"\n".join(lines) + b"\n", "application/jsonl")},
+        timeout=http_timeout,
+    )
+    if not r.ok:
+        raise RuntimeError(f"OpenAI files error {r.status_code}: {r.text}")
+    input_file_id = r.json()["id"]
+
+    try:
+        return _run_openai_batch(
+            base=base,
+            headers=headers,
+            input_file_id=input_file_id,
+            endpoint=endpoint,
+            use_responses=use_responses,
+            http_timeout=http_timeout,
+        )
+    finally:
+        _delete_openai_file(base=base, headers=headers, file_id=input_file_id, http_timeout=http_timeout)
+
+
+def _delete_openai_file(*, base: str, headers: Dict[str, str], file_id: str, http_timeout: int) -> None:
+    # Best effort: a leftover file only costs storage, so it shouldn't fail the feed update.
+    try:
+        r = requests.delete(f"{base}/files/{file_id}", headers=headers, timeout=http_timeout)
+    except requests.exceptions.RequestException as e:
+        print(f"Could not delete OpenAI file {file_id}: {e}", file=sys.stderr)
+        return
+    if not r.ok:
+        print(f"Could not delete OpenAI file {file_id}: {r.status_code} {r.text}", file=sys.stderr)
+
+
+def _get_openai_batch(*, base: str, headers: Dict[str, str], batch_id: str, http_timeout: int) -> Dict[str, Any]:
+    # Polling runs for up to hours, so a transient error shouldn't abandon a batch that is being billed.
+    for attempt in range(3):
+        try:
+            r = requests.get(f"{base}/batches/{batch_id}", headers=headers, timeout=http_timeout)
+        except (requests.exceptions.ReadTimeout, requests.exceptions.ConnectionError):
+            if attempt == 2:
+                raise
+            time.sleep(2**attempt)
+            continue
+        if r.status_code in OPENAI_RETRY_STATUSES and attempt < 2:
+            time.sleep(2**attempt)
+            continue
+        if not r.ok:
+            raise RuntimeError(f"OpenAI batches error {r.status_code}: {r.text}")
+        return r.json()
+    raise RuntimeError("OpenAI batches request failed (unknown error).")
+
+
+def _cancel_openai_batch_quietly(*, base: str, headers: Dict[str, str], batch_id: str, http_timeout: int) -> None:
+    try:
+        r = requests.post(f"{base}/batches/{batch_id}/cancel", headers=headers, timeout=http_timeout)
+    except requests.exceptions.RequestException as e:
+        print(f"Could not cancel OpenAI batch {batch_id}: {e}", file=sys.stderr)
+        return
+    if not r.ok:
+        print(f"Could not cancel OpenAI batch {batch_id}: {r.status_code} {r.text}", file=sys.stderr)
+
+
+def _run_openai_batch(
+    *,
+    base: str,
+    headers: Dict[str, str],
+    input_file_id: str,
+    endpoint: str,
+    use_responses: bool,
+    http_timeout: int,
+) -> Dict[str, str]:
+    r = requests.post(
+        f"{base}/batches",
+        headers=headers,
+        json={"input_file_id": input_file_id, "endpoint": endpoint, "completion_window": "24h"},
+        timeout=http_timeout,
+    )
+    if not r.ok:
+        raise RuntimeError(f"OpenAI batches error {r.status_code}: {r.text}")
+    batch = r.json()
+
+    deadline = time.monotonic() + OPENAI_BATCH_MAX_WAIT_S
+    hard_deadline = deadline + OPENAI_BATCH_CANCEL_GRACE_S
+    cancel_requested = False
+    try:
+        while batch.get("status") not in ("completed", "failed", "expired", "cancelled"):
+            now = time.monotonic()
+            if now >= hard_deadline:
+                # The cancellation itself didn't finish in time; the caller translates everything synchronously.
+                print(f"OpenAI batch {batch['id']} did not finish cancelling; giving up on it.", file=sys.stderr)
+                return {}
+            if not cancel_requested and now >= deadline:
+                # Cancelling still yields an output file for the requests that already finished.
+                r = requests.post(f"{base}/batches/{batch['id']}/cancel", headers=headers, timeout=http_timeout)
+                if not r.ok:
+                    raise RuntimeError(f"OpenAI batches cancel error {r.status_code}: {r.text}")
+                cancel_requested = True
+            time.sleep(OPENAI_BATCH_POLL_S)
+            batch = _get_openai_batch(base=base, headers=headers, batch_id=batch["id"], http_timeout=http_timeout)
+    except Exception:
+        # The run is failing, but the batch would keep running (and billing) without a cancel.
+        if batch.get("status") not in ("failed", "expired", "cancelling", "cancelled"):
+            _cancel_openai_batch_quietly(base=base, headers=headers, batch_id=batch["id"], http_timeout=http_timeout)
+        raise
+
+    if batch.get("status") in ("failed", "expired"):
+        # Whatever is missing gets translated synchronously by the caller.
+        print(f"OpenAI batch {batch['id']} ended {batch['status']}: {batch.get('errors')}", file=sys.stderr)
+
+    error_file_id = batch.get("error_file_id")
+    if error_file_id:
+        _delete_openai_file(base=base, headers=headers, file_id=error_file_id, http_timeout=http_timeout)
+    output_file_id = batch.get("output_file_id")
+    if not output_file_id:
+        return {}
+    try:
+        r = requests.get(f"{base}/files/{output_file_id}/content", headers=headers, timeout=http_timeout)
+        if not r.ok:
+            raise RuntimeError(f"OpenAI files error {r.status_code}: {r.text}")
+        output = r.text
+    finally:
+        _delete_openai_file(base=base, headers=headers, file_id=output_file_id, http_timeout=http_timeout)
+
+    out: Dict[str, str] = {}
+    for line in output.splitlines():
+        if not line.strip():
+            continue
+        item = orjson.loads(line)
+        response = item.get("response") or {}
+        if response.get("status_code") != 200:
+            continue
+        data = response.get("body") or {}
+        # Truncated outputs are left for the synchronous path, which retries them.
+        if use_responses:
+            if data.get("status") == "incomplete":
+                continue
+            text_en = _responses_output_text(data)
+        else:
+            if data["choices"][0].get("finish_reason") == "length":
+                continue
+            text_en = str(data["choices"][0]["message"]["content"]).strip()
+        if text_en:
+            out[str(item.get("custom_id"))] = text_en
+    return out
+
+
 def build_feed(
     *,
     channel: str,
@@ -429,17 +941,17 @@ def build_feed(
     translator: str,
     openai_model: str,
     timeout_s: int,
+    openai_batch: bool = False,
+    translation_cache: Optional[Dict[str, Dict[str, str]]] = None,
 ) -> Dict[str, Any]:
+    """
+    translation_cache (if given) maps "<text_hash>:<translation_key>" -> {"title_en", "text_en"}.
+    It is consulted before translating and updated in place as each translation completes.
+    """
     existing_posts = existing_feed.get("posts") if isinstance(existing_feed.get("posts"), list) else []
-    existing_by_id: Dict[str, Dict[str, Any]] = {}
-    for p in existing_posts:
-        if not isinstance(p, dict):
-            continue
-        pid = p.get("id")
-        if isinstance(pid, int):
-            existing_by_id[str(pid)] = p
-        elif isinstance(pid, str):
-            existing_by_id[pid] = p
+    existing_by_id: Dict[str, Dict[str, Any]] = {
+        str(p["id"]): p for p in existing_posts if isinstance(p, dict) and isinstance(p.get("id"), (int, str))
+    }
 
     translator_effective = translator
     if translator == "auto":
@@ -449,13 +961,19 @@ def build_feed(
     if translator_effective == "openai":
         translation_key = f"openai:{openai_model}:{OPENAI_PROMPT_VERSION}"
 
+    def remember(p: TgPost, title_en: str, text_en: str) -> None:
+        # Recorded as soon as each translation exists, so a later failure in this run doesn't lose it.
+        if translation_cache is not None and text_en.strip():
+            translation_cache[f"{p.text_hash}:{translation_key}"] = {"title_en": title_en, "text_en": text_en}
+
     out_posts: List[Dict[str, Any]] = []
+    # (index into out_posts, post) for posts that need a fresh translation
+    pending: List[Tuple[int, TgPost]] = []
     for p in posts:
         existing = existing_by_id.get(str(p.message_id), {})
-        existing_hash = existing.get("hash") if isinstance(existing, dict) else None
-        existing_text_en = existing.get("text_en") if isinstance(existing, dict) else None
-        existing_title_en = existing.get("title_en") if isinstance(existing, dict) else None
-        existing_translation_key = existing.get("translation_key") if isinstance(existing, dict) else None
+        existing_hash, existing_text_en, existing_title_en, existing_translation_key = (
+            existing.get(k) for k in ("hash", "text_en", "title_en", "translation_key")
+        )
         reuse_translation = (
             isinstance(existing_hash, str)
             and existing_hash == p.content_hash
@@ -480,15 +998,14 @@ def build_feed(
             text_en = existing_text_en
             if reuse_title:
                 title_en = existing_title_en
+            remember(p, title_en, text_en)
         else:
-            if translator_effective == "openai":
-                title_en, text_en = translate_and_format_ru_to_en_openai(
-                    text_ru=p.text_ru,
-                    model=openai_model,
-                    timeout_s=timeout_s,
-                )
+            cached = translation_cache.get(f"{p.text_hash}:{translation_key}") if translation_cache is not None else None
+            if isinstance(cached, dict) and isinstance(cached.get("text_en"), str) and cached["text_en"].strip() != "":
+                text_en = cached["text_en"]
+                title_en = str(cached.get("title_en") or "")
             else:
-                text_en = translate_ru_to_en_argos(p.text_ru)
+                pending.append((len(out_posts), p))
 
         out_posts.append(
             {
@@ -504,6 +1021,55 @@ def build_feed(
             }
         )
 
+    if openai_batch and translator_effective == "openai" and len(pending) >= OPENAI_BATCH_MIN_POSTS:
+        batch_en = translate_ru_to_en_openai_batch(
+            texts_ru={str(p.message_id): p.text_ru for _, p in pending if p.text_ru.strip()},
+            model=openai_model,
+            timeout_s=timeout_s,
+        )
+        for idx, p in pending:
+            if str(p.message_id) in batch_en:
+                out_posts[idx]["text_en"] = batch_en[str(p.message_id)]
+                remember(p, "", batch_en[str(p.message_id)])
+        # Anything the batch didn't return falls through to the synchronous path below.
+        pending = [(idx, p) for idx, p in pending if str(p.message_id) not in batch_en]
+
+    if pending and translator_effective == "openai":
+        # Posts are independent, so translate them concurrently; the pool size caps in-flight requests.
+        with ThreadPoolExecutor(max_workers=OPENAI_MAX_WORKERS) as ex:
+            futures = {
+                ex.submit(
+                    translate_and_format_ru_to_en_openai,
+                    text_ru=p.text_ru,
+                    model=openai_model,
+                    timeout_s=timeout_s,
+                ): (idx, p)
+                for idx, p in pending
+            }
+            try:
+                for fut in as_completed(futures):
+                    idx, p = futures[fut]
+                    title_en, text_en = fut.result()
+                    out_posts[idx]["title_en"] = title_en
+                    out_posts[idx]["text_en"] = text_en
+                    remember(p, title_en, text_en)
+            except Exception:
+                # Don't keep spending on queued requests once the run has failed, but keep
+                # whatever the requests already in flight return: those are paid for.
+                for fut in futures:
+                    fut.cancel()
+                for fut in wait(futures).done:
+                    if not fut.cancelled() and fut.exception() is None:
+                        _, p = futures[fut]
+                        remember(p, *fut.result())
+                raise
+    elif pending:
+        # Argos: translate every pending post in one batched model call.
+        texts_en = translate_ru_to_en_argos_batch([p.text_ru for _, p in pending])
+        for (idx, p), text_en in zip(pending, texts_en):
+            out_posts[idx]["text_en"] = text_en
+            remember(p, "", text_en)
+
     return {
         "generated_at_utc": utc_now_iso(),
         "source": f"https://t.me/{channel}",
@@ -515,9 +1081,9 @@ def build_feed(
 def write_json(path: str, data: Dict[str, Any]) -> None:
     os.makedirs(os.path.dirname(path) or ".", exist_ok=True)
     tmp = path + ".tmp"
-    with open(tmp, "w", encoding="utf-8") as f:
-        json.dump(data, f, ensure_ascii=False, indent=2)
-        f.write("\n")
+    with open(tmp, "wb") as f:
+        f.write(orjson.dumps(data, option=orjson.OPT_INDENT_2 | orjson.OPT_NON_STR_KEYS))
+        f.write(b"\n")
     os.replace(tmp, path)
 
 
@@ -542,6 +1108,8 @@ def main(argv: List[str]) -> int:
         return 2
 
     existing = load_existing_feed(args.out)
+    cache_path = str(args.translation_cache or "")
+    translation_cache = load_translation_cache(cache_path) if cache_path else None
 
     posts = fetch_latest_posts(
         channel=channel,
@@ -551,15 +1119,22 @@ def main(argv: List[str]) -> int:
         user_agent=args.user_agent,
     )
 
-    feed = build_feed(
-        channel=channel,
-        posts=posts,
-        existing_feed=existing,
-        translator=str(args.translator),
-        openai_model=str(args.openai_model),
-        timeout_s=max(5, args.timeout),
-    )
-    write_json(args.out, feed)
+    try:
+        feed = build_feed(
+            channel=channel,
+            posts=posts,
+            existing_feed=existing,
+            translator=str(args.translator),
+            openai_model=str(args.openai_model),
+            timeout_s=max(5, args.timeout),
+            openai_batch=bool(args.openai_batch),
+            translation_cache=translation_cache,
+        )
+        write_json(args.out, feed)
+    finally:
+        # Saved even if the run fails, so translations already paid for aren't requested again.
+        if translation_cache is not None and translator_effective != "none":
+            write_json(cache_path, translation_cache)
     print(f"Wrote {len(posts)} posts to {args.out}")
     return 0
 